@@ -1,11 +1,22 @@
 import os
 import io
+import re
+import mmap
 import zipfile
 import shutil
 import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, time
+from itertools import chain
+from xml.sax.saxutils import escape
 from flask import Flask, render_template, request, send_file, flash, redirect, url_for
 from werkzeug.utils import secure_filename
+from zipstream.ng import ZipStream
 import pandas as pd
+from openpyxl import load_workbook
 
 # ReportLab imports
 from reportlab.lib.pagesizes import A4, landscape
@@ -14,7 +25,9 @@ from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib import rl_accel
 
 # Arabic shaping imports
 import arabic_reshaper
@@ -23,16 +36,32 @@ from bidi.algorithm import get_display
 # Configuration
 ALLOWED_EXTENSIONS = {'xls', 'xlsx'}
 MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200MB
+TABLE_CHUNK_ROWS = 200  # data rows per Table flowable
+COLUMN_SAMPLE_ROWS = 50  # rows measured to size the table columns
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET", "change-this-secret")
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+# ReportLab's C accelerators (pip install "reportlab[accel]") speed up
+# stringWidth, fp_str and PDF string escaping used for every cell
+if rl_accel._py_funcs:
+    app.logger.warning("rl_accel not available, ReportLab uses pure-Python fallbacks for: %s",
+                       ", ".join(sorted(rl_accel._py_funcs)))
+
 # Font setup: put a good Arabic TTF in ./fonts/ (Amiri recommended)
 FONT_DIR = os.path.join(os.path.dirname(__file__), "fonts")
 ARABIC_FONT = os.path.join(FONT_DIR, "Amiri-Regular.ttf")  # change if needed
 ARABIC_FONT_NAME = "Amiri"
 
+# Optional Rust-based reader for .xlsx (pip install python-calamine);
+# falls back to openpyxl in read-only streaming mode
+try:
+    from python_calamine import CalamineWorkbook
+    XLSX_ENGINE = "calamine"
+except ImportError:
+    XLSX_ENGINE = "openpyxl"
+
 # Register font if exists
 if os.path.exists(ARABIC_FONT):
     pdfmetrics.registerFont(TTFont(ARABIC_FONT_NAME, ARABIC_FONT))
@@ -41,6 +70,85 @@ else:
     # You should add a proper Arabic TTF to ./fonts/ for best results.
     ARABIC_FONT_NAME = "Helvetica"
 
+# Styles (built once, shared by every sheet and worker)
+TITLE_STYLE = ParagraphStyle(
+    name="Title",
+    fontName=ARABIC_FONT_NAME,
+    fontSize=14,
+    alignment=TA_CENTER,
+    spaceAfter=8
+)
+CELL_STYLE = ParagraphStyle(
+    name="Cell",
+    fontName=ARABIC_FONT_NAME,
+    fontSize=10,
+    alignment=TA_RIGHT  # align right for RTL
+)
+HEADER_STYLE = ParagraphStyle(
+    name="Header",
+    parent=CELL_STYLE,
+    textColor=colors.white  # same as the TEXTCOLOR of the header row
+)
+
+# Table styling
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#2c3e50")),  # header bg
+    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('ALIGN', (0,0), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('INNERGRID', (0,0), (-1,-1), 0.25, colors.HexColor("#444444")),
+    ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor("#444444")),
+    ('FONTNAME', (0,0), (-1,-1), ARABIC_FONT_NAME),
+    ('FONTSIZE', (0,0), (-1,-1), 10),  # same as CELL_STYLE
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('TOPPADDING', (0,0), (-1,-1), 4),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+])
+
+def py_reshape_display(s):
+    return get_display(arabic_reshaper.reshape(s))
+
+# Samples the compiled reshaper must render exactly like the Python libraries:
+# plain text, harakat, lam-alef/Allah ligatures, mixed digits/Latin, multi-line
+RESHAPE_PARITY_SAMPLES = [
+    "السلام عليكم",
+    "مُحَمَّدٌ رَسُولُ اللَّهِ",
+    "لا إله إلا الله",
+    "الطلب رقم 123 - Order ABC",
+    "سطر أول\nسطر ثاني",
+    "ڤيديو ݐ ࢠ",
+]
+
+# Optional compiled reshaper: an installed `rtl_reshape` module providing
+# reshape_display(s), opt-in with RTL_RESHAPE_NATIVE=1 and only used if it
+# matches the Python output
+reshape_display = py_reshape_display
+if os.environ.get("RTL_RESHAPE_NATIVE") == "1":
+    try:
+        from rtl_reshape import reshape_display as native_reshape_display
+    except ImportError:
+        app.logger.warning("RTL_RESHAPE_NATIVE=1 but rtl_reshape is not installed, using arabic_reshaper")
+    else:
+        mismatched = [s for s in RESHAPE_PARITY_SAMPLES
+                      if native_reshape_display(s) != py_reshape_display(s)]
+        if mismatched:
+            app.logger.warning("rtl_reshape output differs from arabic_reshaper for %r, using arabic_reshaper",
+                               mismatched)
+        else:
+            reshape_display = native_reshape_display
+
+# Arabic unicode block: \u0600-\u06FF, extended: \u0750-\u077F, \u08A0-\u08FF
+# (compiled once; the regex engine scans in C instead of a per-char Python loop)
+ARABIC_RE = re.compile('[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]')
+
+# Reshaped text keyed on the raw string. It lives as long as the server
+# process (and each render worker of the shared pool), so recurring
+# headers/categories (e.g. monthly reports built from the same template) are
+# only reshaped by the first request
+RESHAPE_CACHE = {}
+RESHAPE_CACHE_MAX = 200_000
+
 # Helpers
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -59,34 +167,299 @@ def reshape_rtl(text):
     if text is None:
         return ""
     s = str(text)
-    # quick check: if there are Arabic characters, apply reshaper + bidi
-    # Arabic unicode block: \u0600-\u06FF, extended: \u0750-\u077F, \u08A0-\u08FF
-    if any('\u0600' <= ch <= '\u06FF' or '\u0750' <= ch <= '\u077F' or '\u08A0' <= ch <= '\u08FF' for ch in s):
-        reshaped = arabic_reshaper.reshape(s)
-        bidi_text = get_display(reshaped)
-        return bidi_text
-    else:
+    # quick check: only text with Arabic characters needs reshaper + bidi
+    # (isascii() is O(1) on CPython, so numbers/English skip the regex scan)
+    if s.isascii() or ARABIC_RE.search(s) is None:
         # For non-Arabic, still return string (left-to-right)
         return s
+    # headers and repeated values (statuses, cities, names) are reshaped once
+    # per server process, across requests
+    bidi_text = RESHAPE_CACHE.get(s)
+    if bidi_text is None:
+        if len(RESHAPE_CACHE) >= RESHAPE_CACHE_MAX:
+            RESHAPE_CACHE.clear()
+        bidi_text = RESHAPE_CACHE[s] = reshape_display(s)
+    return bidi_text
+
+class MappedFile(mmap.mmap):
+    # zipfile needs seekable(), which mmap only gained in Python 3.13
+    def seekable(self):
+        return True
+
+def open_workbook(input_path):
+    """
+    Open the workbook once and return (book, sheet_names, mapped).
+    .xlsx is streamed with openpyxl in read-only mode (or parsed with calamine
+    when available); legacy .xls goes through pandas/xlrd.
+    mapped is the memory map openpyxl reads from (None for the other readers);
+    release everything with close_workbook(book, mapped).
+    """
+    if input_path.lower().endswith('xlsx'):
+        if XLSX_ENGINE == "calamine":
+            wb = CalamineWorkbook.from_path(input_path)
+            return wb, wb.sheet_names, None
+        # memory-map the upload so the zip reader pulls its parts straight
+        # from the page cache
+        with open(input_path, 'rb') as f:
+            mapped = MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            wb = load_workbook(mapped, read_only=True, data_only=True)
+        except Exception:
+            mapped.close()
+            raise
+        return wb, wb.sheetnames, mapped
+    xls = pd.ExcelFile(input_path)
+    return xls, xls.sheet_names, None
+
+def close_workbook(book, mapped):
+    book.close()
+    # ZipFile.close() leaves a file object it was given open, and an open
+    # mapping keeps the upload from being deleted on Windows
+    if mapped is not None:
+        mapped.close()
+
+def iter_sheet_rows(book, sheet_name):
+    """
+    Yield the raw cell values of one sheet row by row (header row included),
+    with empty cells as None or ""
+    """
+    if isinstance(book, pd.ExcelFile):
+        df = book.parse(sheet_name, header=None)
+        # NaN/NaT -> None in one vectorized pass, then rows as plain lists
+        yield from df.astype(object).where(df.notna(), None).values.tolist()
+    elif XLSX_ENGINE == "calamine":
+        # keep leading empty rows/columns, as openpyxl does
+        for r in book.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False):
+            yield [calamine_cell(cell) for cell in r]
+    else:
+        ws = book[sheet_name]
+        # the stored <dimension> is often stale in files from other writers and
+        # read-only mode would cut rows down to it; scan the real extent instead
+        ws.reset_dimensions()
+        yield from ws.iter_rows(values_only=True)
+
+def calamine_cell(cell):
+    # calamine reports every number as float and date-only cells as date;
+    # convert them to what openpyxl returns so the PDF doesn't depend on the reader
+    if isinstance(cell, float) and cell.is_integer():
+        return int(cell)
+    if type(cell) is date:
+        return datetime.combine(cell, time())
+    return cell
+
+def is_blank_row(row):
+    return all(cell is None or cell == "" for cell in row)
+
+def last_value_index(row):
+    # index of the last non-blank cell in row, -1 if there is none
+    for i in range(len(row) - 1, -1, -1):
+        if row[i] is not None and row[i] != "":
+            return i
+    return -1
+
+def sheet_to_table_data(rows):
+    """
+    Convert raw sheet rows to a 2D list suitable for ReportLab Table.
+    Leading blank rows are skipped and the first non-blank row is the header.
+    Apply reshape_rtl to each distinct string (None becomes empty string).
+    Returns None if the sheet has no data below the header.
+    """
+    rows = iter(rows)
+    header = next((r for r in rows if not is_blank_row(r)), None)
+    if header is None:
+        return None
+    body = list(rows)
+    # drop trailing blank rows (read-only sheets may report a larger dimension)
+    while body and is_blank_row(body[-1]):
+        body.pop()
+    if not body:
+        return None
+    # reshape each distinct string once (statuses, names, etc. repeat a lot);
+    # other values (numbers, dates) never contain Arabic text
+    reshaped = {s: reshape_rtl(s) for s in {c for r in chain([header], body) for c in r if isinstance(c, str)}}
+
+    def cell_text(c):
+        if isinstance(c, str):
+            return reshaped[c]
+        return "" if c is None else str(c)
+
+    # drop trailing blank columns (read-only sheets return styled but empty
+    # cells as None) and pad shorter rows up to the last used column
+    ncols = max(last_value_index(r) for r in chain([header], body)) + 1
+    headers = [cell_text(c) for c in header[:ncols]]
+    data = [headers + [""] * (ncols - len(headers))]
+    for r in body:
+        row = [cell_text(c) for c in r[:ncols]]
+        data.append(row + [""] * (ncols - len(row)))
+    return data
 
-def df_to_table_data(df):
+def column_widths(data):
+    """
+    Natural column widths: the widest text in the header and the first
+    COLUMN_SAMPLE_ROWS rows, plus cell padding.
+    Passing these to Table skips ReportLab's measuring of every cell.
     """
-    Convert pandas DataFrame to a 2D list suitable for ReportLab Table
-    Apply reshape_rtl to each cell, and convert NaN to empty string
+    sample = data[:COLUMN_SAMPLE_ROWS + 1]
+    widths = []
+    for c in range(len(data[0])):
+        # 10pt is the table font size, 12 the left + right cell padding
+        text_width = max(stringWidth(line, ARABIC_FONT_NAME, 10)
+                         for row in sample for line in row[c].split("\n"))
+        widths.append(text_width + 12)
+    return widths
+
+def render_sheet(book, sheet_name):
     """
-    # header
-    headers = [reshape_rtl(col) for col in df.columns.tolist()]
-    rows = []
-    for _, r in df.iterrows():
-        row = []
-        for cell in r.tolist():
-            if pd.isna(cell):
-                row.append("")
+    Render one sheet of an opened workbook to an in-memory PDF.
+    Returns (pdf_filename, pdf_bytes), or None if the sheet is empty.
+    """
+    # stream rows from the already opened workbook -> table data
+    # (with reshaped Arabic text)
+    data = sheet_to_table_data(iter_sheet_rows(book, sheet_name))
+
+    # skip completely empty sheets
+    if data is None:
+        return None
+
+    # create PDF file named exactly as sheet (Option A)
+    safe_name = sanitize_filename(sheet_name)
+    pdf_filename = f"{safe_name}.pdf"
+
+    # Create PDF document
+    # Using A4 landscape only if the measured columns don't fit the portrait
+    # frame (page width minus 20pt margins), else portrait
+    col_widths = column_widths(data)
+    total_width = sum(col_widths)
+    page_size = A4
+    if total_width > A4[0] - 40:
+        page_size = landscape(A4)
+
+    # PDFs go straight into the zip, so build them in memory, not on disk
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=page_size, rightMargin=20, leftMargin=20, topMargin=30, bottomMargin=20)
+
+    # shrink columns proportionally if they are still wider than the frame,
+    # so the first layout pass fits instead of overflowing
+    if total_width > doc.width:
+        col_widths = [w * doc.width / total_width for w in col_widths]
+
+    # create table cells: Paragraph only where text has to wrap (multi-line or
+    # wider than its final column), other cells stay plain strings styled by
+    # TABLE_STYLE (avoids parsing and laying out a Paragraph per cell)
+    text_widths = [w - 12 for w in col_widths]  # minus left + right padding
+    table_data = []
+    for row_index, row in enumerate(data):
+        row_cells = []
+        for c, cell in enumerate(row):
+            if "\n" in cell or stringWidth(cell, ARABIC_FONT_NAME, 10) > text_widths[c]:
+                # use Paragraph so long text wraps (escaped: cells are not markup)
+                p = Paragraph(escape(cell).replace("\n", "<br/>"),
+                              HEADER_STYLE if row_index == 0 else CELL_STYLE)
             else:
-                row.append(reshape_rtl(cell))
-        rows.append(row)
-    data = [headers] + rows
-    return data
+                p = cell
+            row_cells.append(p)
+        table_data.append(row_cells)
+
+    elements = []
+    # title
+    display_title = reshape_rtl(sheet_name)
+    elements.append(Paragraph(display_title, TITLE_STYLE))
+    elements.append(Spacer(1, 6))
+
+    # split long sheets into several tables sharing the header: ReportLab's
+    # table layout is super-linear in the row count of a single Table
+    header = table_data[0]
+    for i in range(1, len(table_data), TABLE_CHUNK_ROWS):
+        if i > 1:
+            elements.append(Spacer(1, 6))
+        tbl = Table([header] + table_data[i:i + TABLE_CHUNK_ROWS], repeatRows=1, colWidths=col_widths)
+        tbl.setStyle(TABLE_STYLE)
+        elements.append(tbl)
+
+    # build PDF
+    doc.build(elements)
+
+    return pdf_filename, buf.getvalue()
+
+# Start render workers from a forkserver that preloads this module, so they
+# inherit the already parsed Arabic font and imported modules without forking
+# the (threaded) server process; spawn is used where forkserver is unavailable
+# (__name__ is __main__ under `python app.py`; forkservers that ignore the
+# parent's sys.path/main path, as on Python 3.11, skip it: see check_preload)
+if "forkserver" in multiprocessing.get_all_start_methods():
+    POOL_CONTEXT = multiprocessing.get_context("forkserver")
+    POOL_CONTEXT.set_forkserver_preload([__name__])
+else:
+    POOL_CONTEXT = None
+
+# Process that imported this module (the forkserver's pid in a preloaded worker)
+IMPORTED_IN_PID = os.getpid()
+
+def check_preload():
+    # The forkserver skips a preload it can't import without saying so
+    if IMPORTED_IN_PID == os.getpid():
+        app.logger.warning("forkserver preload of %s failed, render workers import it themselves", __name__)
+
+# One render pool per server process, started on first use and shared by all
+# requests, so every worker keeps its own RESHAPE_CACHE between requests
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=POOL_CONTEXT,
+                                        initializer=check_preload if POOL_CONTEXT else None)
+        return _pool
+
+def drop_pool(pool):
+    # a worker died: the next request starts a fresh pool
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def render_sheet_in_worker(input_path, sheet_name):
+    # The pool outlives the request, so the upload is opened per sheet and
+    # closed before the worker moves on
+    book, _, mapped = open_workbook(input_path)
+    try:
+        return render_sheet(book, sheet_name)
+    finally:
+        close_workbook(book, mapped)
+
+def render_sheets(book, input_path, sheet_names):
+    """
+    Yield (pdf_filename, pdf_bytes) for every non-empty sheet as soon as it
+    is rendered.
+    Sheets are rendered in parallel on the shared pool (one process per core);
+    a single sheet is rendered in-process.
+    """
+    workers = min(len(sheet_names), os.cpu_count() or 1)
+    if workers <= 1:
+        for sheet_name in sheet_names:
+            pdf = render_sheet(book, sheet_name)
+            if pdf:
+                yield pdf
+        return
+    pool = get_pool()
+    futures = []
+    try:
+        futures = [pool.submit(render_sheet_in_worker, input_path, sheet_name) for sheet_name in sheet_names]
+        for future in as_completed(futures):
+            pdf = future.result()
+            if pdf:
+                yield pdf
+    except BrokenProcessPool:
+        drop_pool(pool)
+        raise
+    finally:
+        # closed early (client went away, or a sheet failed): drop the sheets
+        # still queued; ones already rendering finish in the background
+        for future in futures:
+            future.cancel()
 
 @app.route("/", methods=["GET"])
 def index():
@@ -110,127 +483,70 @@ def convert():
     filename = secure_filename(file.filename)
 
     workdir = tempfile.mkdtemp(prefix="xls2pdf_")
+    book = None
+    mapped = None
+    pdfs = None
+    streaming = False
+
+    def cleanup():
+        if pdfs is not None:
+            pdfs.close()  # cancels the sheets still queued on the pool
+        if book is not None:
+            close_workbook(book, mapped)
+        try:
+            shutil.rmtree(workdir)
+        except Exception:
+            pass
+
     try:
         input_path = os.path.join(workdir, filename)
         file.save(input_path)
 
-        # read sheet names
+        # open the workbook once and read sheet names
         try:
-            xls = pd.ExcelFile(input_path)
-            sheet_names = xls.sheet_names
+            book, sheet_names, mapped = open_workbook(input_path)
         except Exception as e:
             flash(f"Failed to read Excel file: {str(e)}", "danger")
             return redirect(url_for('index'))
 
-        pdf_paths = []
-
-        for sheet_name in sheet_names:
-            # read sheet into df
-            try:
-                # openpyxl for xlsx, xlrd fallback for xls if needed
-                engine = 'openpyxl' if filename.lower().endswith('xlsx') else None
-                df = pd.read_excel(input_path, sheet_name=sheet_name, engine=engine)
-            except Exception:
-                df = pd.read_excel(input_path, sheet_name=sheet_name)
-
-            # skip completely empty sheets
-            if df.dropna(how='all').empty:
-                continue
-
-            # convert df -> table data (with reshaped Arabic text)
-            data = df_to_table_data(df)
-
-            # create PDF file named exactly as sheet (Option A)
-            safe_name = sanitize_filename(sheet_name)
-            pdf_filename = f"{safe_name}.pdf"
-            pdf_path = os.path.join(workdir, pdf_filename)
-
-            # Create PDF document
-            # Using A4 landscape if many columns, else portrait
-            page_size = A4
-            try:
-                # choose landscape if >6 columns
-                if len(data[0]) > 6:
-                    page_size = landscape(A4)
-            except Exception:
-                page_size = A4
-
-            doc = SimpleDocTemplate(pdf_path, pagesize=page_size, rightMargin=20, leftMargin=20, topMargin=30, bottomMargin=20)
-
-            # styles
-            title_style = ParagraphStyle(
-                name="Title",
-                fontName=ARABIC_FONT_NAME,
-                fontSize=14,
-                alignment=TA_CENTER,
-                spaceAfter=8
-            )
-            cell_style = ParagraphStyle(
-                name="Cell",
-                fontName=ARABIC_FONT_NAME,
-                fontSize=10,
-                alignment=TA_RIGHT  # align right for RTL
-            )
-
-            # create table with Paragraphs so fonts & alignment apply
-            table_data = []
-            for row_index, row in enumerate(data):
-                row_cells = []
-                for cell in row:
-                    # use Paragraph so long text wraps
-                    p = Paragraph(cell.replace("\n", "<br/>"), cell_style)
-                    row_cells.append(p)
-                table_data.append(row_cells)
-
-            # table styling
-            tbl = Table(table_data, repeatRows=1)
-            tbl.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#2c3e50")),  # header bg
-                ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                ('ALIGN', (0,0), (-1,-1), 'RIGHT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('INNERGRID', (0,0), (-1,-1), 0.25, colors.HexColor("#444444")),
-                ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor("#444444")),
-                ('FONTNAME', (0,0), (-1,-1), ARABIC_FONT_NAME),
-                ('FONTSIZE', (0,0), (-1,-1), 9),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('TOPPADDING', (0,0), (-1,-1), 4),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-            ]))
-
-            elements = []
-            # title
-            display_title = reshape_rtl(sheet_name)
-            elements.append(Paragraph(display_title, title_style))
-            elements.append(Spacer(1, 6))
-            elements.append(tbl)
-
-            # build PDF
-            doc.build(elements)
-
-            pdf_paths.append(pdf_path)
-
-        if not pdf_paths:
+        # wait for the first rendered sheet so an all-empty workbook can
+        # still be reported on the page instead of as an empty zip
+        pdfs = render_sheets(book, input_path, sheet_names)
+        first_pdf = next(pdfs, None)
+        if first_pdf is None:
             flash("No non-empty sheets found in the uploaded Excel file.", "warning")
             return redirect(url_for('index'))
 
-        # zip the PDFs into memory
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for p in pdf_paths:
-                zf.write(p, arcname=os.path.basename(p))
-        memory_file.seek(0)
+        # a workbook with a single non-empty sheet gets its PDF directly,
+        # without a zip around it
+        second_pdf = next(pdfs, None)
+        if second_pdf is None:
+            pdf_filename, pdf_bytes = first_pdf
+            return send_file(io.BytesIO(pdf_bytes), mimetype='application/pdf',
+                             as_attachment=True, download_name=pdf_filename)
+
+        def generate():
+            # stream each PDF into the zip as soon as its sheet is rendered,
+            # without holding the archive in memory; PDFs are already
+            # Flate-compressed, so they are stored rather than deflated again
+            zs = ZipStream(compress_type=zipfile.ZIP_STORED)
+            for pdf_filename, pdf_bytes in chain([first_pdf, second_pdf], pdfs):
+                zs.add(pdf_bytes, arcname=pdf_filename)
+                yield from zs.all_files()
+            yield from zs.finalize()
 
         zip_name = os.path.splitext(filename)[0] + "_pdfs.zip"
-        return send_file(memory_file, mimetype='application/zip',
-                         as_attachment=True, download_name=zip_name)
+        response = app.response_class(generate(), mimetype='application/zip', headers={
+            'Content-Disposition': f'attachment; filename="{zip_name}"'
+        })
+        # the uploaded workbook must outlive this function (workers are still
+        # reading it): clean up once the body is sent
+        response.call_on_close(cleanup)
+        streaming = True
+        return response
     finally:
-        # cleanup
-        try:
-            shutil.rmtree(workdir)
-        except Exception:
-            pass
+        if not streaming:
+            cleanup()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))